@@ -6,12 +6,12 @@ Compatible con python-telegram-bot v20/21+ y metaapi-cloud-sdk asíncrono.
 """
 
 import os
-import math
+import re
+import asyncio
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, NamedTuple
 
 from metaapi_cloud_sdk import MetaApi
-from prettytable import PrettyTable
 
 from telegram import Update, ParseMode
 from telegram.constants import ParseMode as PM
@@ -33,184 +33,254 @@ logger = logging.getLogger(__name__)
 CALCULATE, TRADE, DECISION = range(3)
 
 # Símbolos permitidos (mantené o adaptá según lo necesites)
-SYMBOLS = [
+SYMBOLS = frozenset({
     "AUDCAD", "AUDCHF", "AUDJPY", "AUDNZD", "AUDUSD", "CADCHF", "CADJPY", "CHFJPY", "EURAUD", "EURCAD", "EURCHF",
-    "EURGBP", "EURJPY", "EURNZD", "EURUSD", "GBPAUD", "GBPCAD", "GBPCHF", "GBPJPY", "GBPNZD", "GBPUSD", "NOW",
+    "EURGBP", "EURJPY", "EURNZD", "EURUSD", "GBPAUD", "GBPCAD", "GBPCHF", "GBPJPY", "GBPNZD", "GBPUSD",
     "NZDCAD", "NZDCHF", "NZDJPY", "NZDUSD", "USDCAD", "USDCHF", "USDJPY", "XAGUSD", "XAUUSD"
-]
-
-# Carga de environment variables
-API_KEY = os.environ.get("API_KEY")
-ACCOUNT_ID = os.environ.get("ACCOUNT_ID")
-TOKEN = os.environ.get("TOKEN")
-TELEGRAM_USER = os.environ.get("TELEGRAM_USER")  # sin '@'
-APP_URL = os.environ.get("APP_URL", "")
+})
+
+# Pares cotizados con 2 (o 3) decimales: el pip es 0.01
+_TWO_DECIMAL = frozenset({"USDJPY", "EURJPY", "GBPJPY", "AUDJPY", "NZDJPY", "CADJPY", "CHFJPY"})
+
+# Tipos de orden reconocidos al inicio del signal (claves en mayúscula, palabras separadas por un espacio)
+_ORDER_TYPES = {
+    "BUY LIMIT": "Buy Limit",
+    "SELL LIMIT": "Sell Limit",
+    "BUY STOP": "Buy Stop",
+    "SELL STOP": "Sell Stop",
+    "BUY": "Buy",
+    "SELL": "Sell",
+}
+
+# Tipo de orden -> (método de la conexión RPC de MetaApi, ¿lleva precio de entrada?)
+_ORDER_SPEC = {
+    "Buy": ("create_market_buy_order", False),
+    "Sell": ("create_market_sell_order", False),
+    "Buy Limit": ("create_limit_buy_order", True),
+    "Sell Limit": ("create_limit_sell_order", True),
+    "Buy Stop": ("create_stop_buy_order", True),
+    "Sell Stop": ("create_stop_sell_order", True),
+}
+
+# Carga de environment variables (falla al iniciar si falta alguna obligatoria)
+_REQUIRED_ENV = ("API_KEY", "ACCOUNT_ID", "TOKEN", "TELEGRAM_USER_ID", "APP_URL")
+_missing_env = [k for k in _REQUIRED_ENV if not os.environ.get(k)]
+if _missing_env:
+    raise RuntimeError(
+        f"Faltan variables de entorno obligatorias: {', '.join(_missing_env)}")
+
+API_KEY = os.environ["API_KEY"]
+ACCOUNT_ID = os.environ["ACCOUNT_ID"]
+TOKEN = os.environ["TOKEN"]
+try:
+    # ID numérico de Telegram (no cambia si el usuario cambia su @username)
+    TELEGRAM_USER_ID = int(os.environ["TELEGRAM_USER_ID"])
+except ValueError:
+    raise RuntimeError("TELEGRAM_USER_ID debe ser el ID numérico del usuario de Telegram") from None
+APP_URL = os.environ["APP_URL"]
 PORT = int(os.environ.get("PORT", "8443"))
+METAAPI_DOMAIN = os.environ.get("METAAPI_DOMAIN", "agiliumtrade.agiliumtrade.ai")
 try:
+    # fracción del balance arriesgada por trade (0.01 = 1 %)
     RISK_FACTOR = float(os.environ.get("RISK_FACTOR", "0.01"))
-except Exception:
-    RISK_FACTOR = 0.01
+except ValueError:
+    raise RuntimeError("RISK_FACTOR debe ser un número decimal, ej. 0.01 para 1 %") from None
+if not 0 < RISK_FACTOR < float("inf"):
+    raise RuntimeError(f"RISK_FACTOR debe ser un número finito mayor que 0, se recibió {RISK_FACTOR}")
 
-if not all([API_KEY, ACCOUNT_ID, TOKEN, TELEGRAM_USER, APP_URL]):
-    logger.warning(
-        "Faltan variables de entorno importantes. Asegurate de setear API_KEY, ACCOUNT_ID, TOKEN, TELEGRAM_USER y APP_URL")
+# Filtro de autorización: solo TELEGRAM_USER_ID llega a los handlers
+AUTH = filters.User(user_id=TELEGRAM_USER_ID)
 
 # ---------- Helpers ----------
 
+# Parser del signal generado una sola vez a partir de la gramática fija:
+#   <TIPO> [...] <SYMBOL>
+#   ... <ENTRY|NOW>
+#   ... <SL>
+#   ... <TP1>
+#   [... <TP2>]
+# Cada campo es la última palabra de su línea; las líneas en blanco se ignoran.
+# Los saltos de línea se normalizan a "\n" y el texto llega sin whitespace en los extremos
+# (ver parse_signal), así que el espacio dentro de una línea es cualquier whitespace
+# excepto "\n" (incluye NBSP).
+# Cada tramo de espacios lo consume un único cuantificador: si dos pudieran repartírselo,
+# rechazar un header mal pegado con muchos espacios pasa a ser O(n²) u O(n³).
+_NUM = r"[-+]?\d+(?:\.\d+)?"
+_SP = r"[^\S\n]"
+_EOL = rf"{_SP}*"
+_NL = rf"\n(?:{_SP}*\n)*"  # fin de línea + líneas en blanco
+_FIELD = rf"[^\n]*?(?<!\S)"  # resto de la línea hasta la última palabra
+# tipos más largos primero para que "BUY LIMIT" gane sobre "BUY"
+_TYPES = "|".join(t.replace(" ", rf"{_SP}+")
+                  for t in sorted(_ORDER_TYPES, key=len, reverse=True))
+_SYMBOLS = "|".join(sorted(SYMBOLS))
+_SIGNAL_RE = re.compile(
+    rf"({_TYPES})(?:{_SP}+\S+)*?{_SP}+({_SYMBOLS}){_EOL}{_NL}"
+    rf"{_FIELD}(NOW|{_NUM}){_EOL}{_NL}"
+    rf"{_FIELD}({_NUM}){_EOL}{_NL}"
+    rf"{_FIELD}({_NUM}){_EOL}"
+    rf"(?:\Z|{_NL}{_FIELD}({_NUM}){_EOL}(?:\n|\Z))",
+    re.IGNORECASE,
+)
+
 
 def parse_signal(signal_text: str) -> Dict:
     """
     Parsea el texto del signal y devuelve dict con OrderType, Symbol, Entry, StopLoss, TP(list), RiskFactor
     Retorna {} si inválido.
     """
-    lines = [l.strip() for l in signal_text.splitlines() if l.strip()]
-    if not lines:
-        return {}
-
-    first = lines[0].lower()
-
-    order_type = None
-    if "buy limit" in first:
-        order_type = "Buy Limit"
-    elif "sell limit" in first:
-        order_type = "Sell Limit"
-    elif "buy stop" in first:
-        order_type = "Buy Stop"
-    elif "sell stop" in first:
-        order_type = "Sell Stop"
-    elif first.startswith("buy"):
-        order_type = "Buy"
-    elif first.startswith("sell"):
-        order_type = "Sell"
-    else:
-        return {}
-
-    # Symbol: última palabra de la primera línea
-    parts = lines[0].split()
-    symbol = parts[-1].upper()
-
-    if symbol not in SYMBOLS:
-        return {}
-
-    # Entry: segunda línea, última palabra (puede ser NOW)
-    if len(lines) < 4:
-        return {}  # necesitamos al menos Entry, SL y TP
-
-    entry_raw = lines[1].split()[-1].upper()
-    entry: Optional[float] = entry_raw
-    if entry_raw != "NOW":
-        try:
-            entry = float(entry_raw)
-        except Exception:
-            return {}
-
-    # Stop Loss
-    try:
-        stoploss = float(lines[2].split()[-1])
-    except Exception:
-        return {}
-
-    # TP (1 o 2)
-    tp_list: List[float] = []
-    try:
-        tp_list.append(float(lines[3].split()[-1]))
-        if len(lines) > 4:
-            tp_list.append(float(lines[4].split()[-1]))
-    except Exception:
+    # splitlines() corta también en \r, \x0b, \x0c, \x1c-\x1e, \x85, \u2028 y \u2029
+    m = _SIGNAL_RE.match("\n".join(signal_text.splitlines()).strip())
+    if m is None:
         return {}
 
+    order_raw, symbol, entry_raw, sl, tp1, tp2 = m.groups()
+    entry_raw = entry_raw.upper()
     return {
-        "OrderType": order_type,
-        "Symbol": symbol,
-        "Entry": entry,        # float o 'NOW' (str)
-        "StopLoss": stoploss,
-        "TP": tp_list,
+        "OrderType": _ORDER_TYPES[" ".join(order_raw.upper().split())],
+        "Symbol": symbol.upper(),
+        "Entry": entry_raw if entry_raw == "NOW" else float(entry_raw),        # float o 'NOW' (str)
+        "StopLoss": float(sl),
+        "TP": [float(tp1)] if tp2 is None else [float(tp1), float(tp2)],
         "RiskFactor": RISK_FACTOR,
     }
 
 
-def _get_multiplier(symbol: str, entry_value) -> float:
+def _get_multiplier(symbol: str) -> float:
     """
     Determina el multiplicador para convertir diferencia en pips.
-    XAUUSD -> 0.1, XAGUSD -> 0.001, otros -> 0.0001 o 0.01 según decimales.
+    XAUUSD -> 0.1, XAGUSD -> 0.001, pares JPY -> 0.01, otros -> 0.0001.
     """
     if symbol == "XAUUSD":
         return 0.1
     if symbol == "XAGUSD":
         return 0.001
-
-    # Si entry_value es cadena (NOW) devolvemos 0.0001 por defecto
-    try:
-        if isinstance(entry_value, str):
-            return 0.0001
-        s = f"{entry_value}"
-        if "." in s:
-            decimals = len(s.split(".")[1])
-            # pares con 3 o más decimales -> 0.01 (estoy manteniendo la lógica anterior)
-            if decimals >= 3:
-                return 0.01
-    except Exception:
-        pass
+    if symbol in _TWO_DECIMAL:
+        return 0.01
     return 0.0001
 
 
+class RiskNumbers(NamedTuple):
+    stop_loss_pips: int
+    position_size: float
+    tp_pips: List[int]
+
+
+def _risk_numbers(balance: float, risk: float, sl: float, entry: float, tps: List[float],
+                  mult: float) -> RiskNumbers:
+    """
+    Calcula pips de SL, position size y pips de cada TP para un trade, solo con aritmética.
+    Si el stop loss da 0 pips devuelve RiskNumbers(0, 0.0, []) para que el caller lo reporte.
+    """
+    stop_pips = abs(round((sl - entry) / mult))
+    if stop_pips == 0:
+        return RiskNumbers(0, 0.0, [])
+
+    # position size formula original adaptada; int() trunca = floor a 2 decimales (valor siempre positivo)
+    pos_size = int(balance * risk / stop_pips / 10 * 100) / 100
+
+    tp_pips = [abs(round((tp - entry) / mult)) for tp in tps]
+    return RiskNumbers(stop_pips, pos_size, tp_pips)
+
+
 def create_table(trade: Dict, balance: float, stop_loss_pips: int, tp_pips: List[int]) -> str:
-    """Construye una tabla tipo PrettyTable y la devuelve como string (para enviar por Telegram)."""
-    table = PrettyTable()
-    table.title = "Trade Information"
-    table.field_names = ["Key", "Value"]
-    table.align["Key"] = "l"
-    table.align["Value"] = "l"
-
-    table.add_row([trade["OrderType"], trade["Symbol"]])
-    table.add_row(["Entry", trade["Entry"]])
-    table.add_row(["Stop Loss", f"{stop_loss_pips} pips"])
-
-    for i, p in enumerate(tp_pips):
-        table.add_row([f"TP {i+1}", f"{p} pips"])
-
-    table.add_row(["Risk Factor", f"{trade['RiskFactor'] * 100:.0f} %"])
-    table.add_row(["Position Size (lots)", f"{trade.get('PositionSize', 0)}"])
-    table.add_row(["Current Balance", f"$ {balance:,.2f}"])
-    potential_loss = round(
-        (trade.get("PositionSize", 0) * 10) * stop_loss_pips, 2)
-    table.add_row(["Potential Loss", f"$ {potential_loss:,.2f}"])
-
-    total_profit = 0.0
-    for i, p in enumerate(tp_pips):
-        profit = round((trade.get("PositionSize", 0) *
-                       10 * (1 / len(tp_pips))) * p, 2)
-        table.add_row([f"TP {i+1} Profit", f"$ {profit:,.2f}"])
-        total_profit += profit
-
-    table.add_row(["Total Profit", f"$ {total_profit:,.2f}"])
-
-    return str(table)
+    """Construye una tabla de dos columnas (estilo PrettyTable) y la devuelve como string (para enviar por Telegram)."""
+    pos_size = trade.get("PositionSize", 0)
+    potential_loss = round((pos_size * 10) * stop_loss_pips, 2)
+    # valor por pip de cada TP (misma fracción de la posición para todos)
+    pip_value = pos_size * 10 / len(tp_pips)
+    profits = [round(pip_value * p, 2) for p in tp_pips]
+    total_profit = sum(profits)
+
+    rows = [(trade["OrderType"], trade["Symbol"]),
+            ("Entry", str(trade["Entry"])),
+            ("Stop Loss", f"{stop_loss_pips} pips")]
+    rows += [(f"TP {i+1}", f"{p} pips") for i, p in enumerate(tp_pips)]
+    rows += [("Risk Factor", f"{trade['RiskFactor'] * 100:.0f} %"),
+             ("Position Size (lots)", f"{pos_size}"),
+             ("Current Balance", f"$ {balance:,.2f}"),
+             ("Potential Loss", f"$ {potential_loss:,.2f}")]
+    rows += [(f"TP {i+1} Profit", f"$ {p:,.2f}") for i, p in enumerate(profits)]
+    rows.append(("Total Profit", f"$ {total_profit:,.2f}"))
+
+    # anchos calculados una sola vez para todas las filas
+    k_w = max(len("Key"), max(len(k) for k, _ in rows))
+    v_w = max(len("Value"), max(len(v) for _, v in rows))
+    sep = f"+{'-' * (k_w + 2)}+{'-' * (v_w + 2)}+"
+    title = "Trade Information"
+    inner_w = k_w + v_w + 3
+    return "\n".join([
+        f"+{'-' * (inner_w + 2)}+",
+        f"| {title:^{inner_w}} |",
+        sep,
+        f"| {'Key':<{k_w}} | {'Value':<{v_w}} |",
+        sep,
+        *(f"| {k:<{k_w}} | {v:<{v_w}} |" for k, v in rows),
+        sep,
+    ])
 
 # ---------- MetaTrader connection & trade logic (async) ----------
 
+# Estado de MetaApi en app.bot_data, creado en post_init dentro del event loop del bot:
+#   "metaapi": instancia MetaApi compartida (una sola pila HTTP/WebSocket para todo el bot)
+#   "mt_lock": asyncio.Lock que serializa el (re)armado de la conexión
+#   "mt_connection": conexión RPC cacheada entre mensajes (se reconstruye si falla el health check)
+
+
+async def _close_quietly(connection):
+    """Cierra una conexión RPC (descartada o al apagar el bot); los errores al cerrar solo se loguean."""
+    try:
+        await connection.close()
+    except Exception as e:
+        logger.warning("Error al cerrar conexión MetaApi: %s", e)
+
 
-async def connect_and_process(update: Update, trade: Dict, enter_trade: bool):
+async def get_connection(bot_data: Dict):
     """
-    Conecta via MetaApi y calcula/ejecuta trade según enter_trade boolean.
+    Devuelve (connection, account_info) reutilizando la conexión RPC cacheada en bot_data.
+    Solo hace el handshake completo (deploy / connect / sync) la primera vez o si la conexión cacheada dejó de responder.
     """
-    api = MetaApi(API_KEY)
-    try:
-        account = await api.metatrader_account_api.get_account(ACCOUNT_ID)
+    async with bot_data["mt_lock"]:
+        connection = bot_data["mt_connection"]
+        if connection is not None:
+            try:
+                return connection, await connection.get_account_information()
+            except Exception as e:
+                logger.warning("Conexión cacheada inválida, reconectando: %s", e)
+                bot_data["mt_connection"] = None
+                await _close_quietly(connection)
+
+        account = await bot_data["metaapi"].metatrader_account_api.get_account(ACCOUNT_ID)
         # deploy si necesita
         if account.state not in ("DEPLOYED", "DEPLOYING"):
             logger.info("Deploying account...")
             await account.deploy()
 
+        # DEPLOYED no implica que el terminal esté conectado al broker: esperar siempre
         logger.info("Waiting for account to connect to broker...")
         await account.wait_connected()
 
         connection = account.get_rpc_connection()
-        await connection.connect()
-        logger.info("Waiting for SDK to synchronize to terminal state ...")
-        await connection.wait_synchronized()
+        try:
+            await connection.connect()
+            logger.info("Waiting for SDK to synchronize to terminal state ...")
+            await connection.wait_synchronized()
+            account_info = await connection.get_account_information()
+        except Exception:
+            # no queda cacheada: cerrarla para no dejar el websocket abierto
+            await _close_quietly(connection)
+            raise
 
-        account_info = await connection.get_account_information()
+        bot_data["mt_connection"] = connection
+        return connection, account_info
+
+
+async def connect_and_process(update: Update, context: ContextTypes.DEFAULT_TYPE, trade: Dict, enter_trade: bool):
+    """
+    Conecta via MetaApi y calcula/ejecuta trade según enter_trade boolean.
+    """
+    try:
+        connection, account_info = await get_connection(context.application.bot_data)
         await update.effective_message.reply_text("✅ Conectado a MetaTrader. Calculando riesgo ...")
 
         # si entry es NOW, obtener precio actual
@@ -222,29 +292,17 @@ async def connect_and_process(update: Update, trade: Dict, enter_trade: bool):
                 trade["Entry"] = float(symbol_price["ask"])
 
         # calcular pips y position size
-        multiplier = _get_multiplier(trade["Symbol"], trade["Entry"])
-        # prevenir division por cero
-        if multiplier == 0:
-            await update.effective_message.reply_text("Error interno: multiplier es 0.")
-            return
-
-        stop_loss_pips = abs(
-            round((trade["StopLoss"] - trade["Entry"]) / multiplier))
+        multiplier = _get_multiplier(trade["Symbol"])
+        stop_loss_pips, pos_size, tp_pips = _risk_numbers(
+            account_info["balance"], trade["RiskFactor"], trade["StopLoss"],
+            trade["Entry"], trade["TP"], multiplier)
         if stop_loss_pips == 0:
             await update.effective_message.reply_text("Stop loss calculado en 0 pips -> revisar valores de Entry/SL.")
             return
-
-        # position size formula original adaptada y redondeada a 2 decimales
-        pos_size = ((account_info["balance"] *
-                    trade["RiskFactor"]) / stop_loss_pips) / 10
-        pos_size = math.floor(pos_size * 100) / 100  # floor a 2 decimales
         trade["PositionSize"] = pos_size
 
-        # take profit pips
-        tp_pips = [abs(round((tp - trade["Entry"]) / multiplier))
-                   for tp in trade["TP"]]
-
-        # enviar tabla con info
+        # enviar tabla con info (create_table es un formateo de ~15 filas: se deja inline,
+        # pasarlo a un executor costaría más que lo que bloquea el event loop)
         table_str = create_table(
             trade, account_info["balance"], stop_loss_pips, tp_pips)
         await update.effective_message.reply_text(f"<pre>{table_str}</pre>", parse_mode=ParseMode.HTML)
@@ -253,34 +311,29 @@ async def connect_and_process(update: Update, trade: Dict, enter_trade: bool):
         if enter_trade:
             await update.effective_message.reply_text("Entrando trade en MetaTrader...")
             try:
-                results = []
                 share = trade["PositionSize"] / max(1, len(trade["TP"]))
-                if trade["OrderType"] == "Buy":
-                    for tp in trade["TP"]:
-                        res = await connection.create_market_buy_order(trade["Symbol"], share, trade["StopLoss"], tp)
-                        results.append(res)
-                elif trade["OrderType"] == "Sell":
-                    for tp in trade["TP"]:
-                        res = await connection.create_market_sell_order(trade["Symbol"], share, trade["StopLoss"], tp)
-                        results.append(res)
-                elif trade["OrderType"] == "Buy Limit":
-                    for tp in trade["TP"]:
-                        res = await connection.create_limit_buy_order(trade["Symbol"], share, trade["Entry"], trade["StopLoss"], tp)
-                        results.append(res)
-                elif trade["OrderType"] == "Sell Limit":
-                    for tp in trade["TP"]:
-                        res = await connection.create_limit_sell_order(trade["Symbol"], share, trade["Entry"], trade["StopLoss"], tp)
-                        results.append(res)
-                elif trade["OrderType"] == "Buy Stop":
-                    for tp in trade["TP"]:
-                        res = await connection.create_stop_buy_order(trade["Symbol"], share, trade["Entry"], trade["StopLoss"], tp)
-                        results.append(res)
-                elif trade["OrderType"] == "Sell Stop":
-                    for tp in trade["TP"]:
-                        res = await connection.create_stop_sell_order(trade["Symbol"], share, trade["Entry"], trade["StopLoss"], tp)
-                        results.append(res)
-                await update.effective_message.reply_text("✅ Trade ejecutado correctamente.")
+                method_name, needs_entry = _ORDER_SPEC[trade["OrderType"]]
+                fn = getattr(connection, method_name)
+                args_common = (trade["Symbol"], share) + \
+                    ((trade["Entry"],) if needs_entry else ()) + (trade["StopLoss"],)
+                # una orden por TP, enviadas en paralelo
+                results = await asyncio.gather(
+                    *[fn(*args_common, tp) for tp in trade["TP"]], return_exceptions=True)
+                errors = []
+                for i, res in enumerate(results, 1):
+                    # BaseException: una orden cancelada vuelve como CancelledError, que no es Exception
+                    if isinstance(res, BaseException):
+                        logger.error("Error en la orden TP %d: %r", i, res)
+                        errors.append(res)
+                # loguear siempre: si falló algún TP, los IDs de las órdenes que sí entraron quedan registrados
                 logger.info("Trade results: %s", results)
+                if errors:
+                    ok = len(results) - len(errors)
+                    first_error = str(errors[0]) or type(errors[0]).__name__
+                    await update.effective_message.reply_text(
+                        f"⚠️ Se ejecutaron {ok} de {len(results)} órdenes. Primer error:\n{first_error}")
+                else:
+                    await update.effective_message.reply_text("✅ Trade ejecutado correctamente.")
             except Exception as e:
                 logger.exception("Error al ejecutar trade: %s", e)
                 await update.effective_message.reply_text(f"Hubo un error al ejecutar el trade:\n{e}")
@@ -291,52 +344,51 @@ async def connect_and_process(update: Update, trade: Dict, enter_trade: bool):
 
 # ---------- Handlers (async) ----------
 
+# Textos fijos de respuesta
+_WELCOME = (
+    "Welcome to the FX Signal Copier Telegram Bot! 💻💸\n\n"
+    "Usá /help para ver instrucciones."
+)
+
+_HELP_TEXT = (
+    "Comandos:\n"
+    "/trade - Ingresar trade y ejecutar\n"
+    "/calculate - Calcular tamaños y riesgos (no ejecuta)\n"
+    "/cancel - Cancelar\n\n"
+    "Formato ejemplo:\n"
+    "BUY GBPUSD\nEntry NOW\nSL 1.14336\nTP 1.28930\nTP 1.29845\n\n"
+    "Usá 'NOW' para market execution."
+)
+
+_PARSE_ERROR = "Error al parsear el trade. Revisá el formato.\nEjemplo:\nBUY GBPUSD\nEntry NOW\nSL 1.14336\nTP 1.28930"
+
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.effective_message.reply_text(
-        "Welcome to the FX Signal Copier Telegram Bot! 💻💸\n\n"
-        "Usá /help para ver instrucciones."
-    )
+    await update.effective_message.reply_text(_WELCOME)
 
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    help_text = (
-        "Comandos:\n"
-        "/trade - Ingresar trade y ejecutar\n"
-        "/calculate - Calcular tamaños y riesgos (no ejecuta)\n"
-        "/cancel - Cancelar\n\n"
-        "Formato ejemplo:\n"
-        "BUY GBPUSD\nEntry NOW\nSL 1.14336\nTP 1.28930\nTP 1.29845\n\n"
-        "Usá 'NOW' para market execution."
-    )
-    await update.effective_message.reply_text(help_text)
+    await update.effective_message.reply_text(_HELP_TEXT)
+
+
+async def deny_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Responde a cualquier mensaje de un usuario no autorizado (filtrado por ~AUTH)."""
+    await update.effective_message.reply_text("No estás autorizado para usar este bot.")
 
 
 async def unknown_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Responde a mensajes que no son parte del flujo si el usuario está autorizado."""
-    username = update.effective_user.username or ""
-    if username != TELEGRAM_USER:
-        await update.effective_message.reply_text("No estás autorizado para usar este bot.")
-        return
+    """Responde a mensajes que no son parte del flujo."""
     await update.effective_message.reply_text("Comando desconocido. /help para instrucciones.")
 
 
 async def trade_entry(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Pide el trade (estado TRADE)."""
-    username = update.effective_user.username or ""
-    if username != TELEGRAM_USER:
-        await update.effective_message.reply_text("No estás autorizado para usar este bot.")
-        return ConversationHandler.END
     context.user_data["trade"] = None
     await update.effective_message.reply_text("Por favor ingresá el trade (formato en /help).")
     return TRADE
 
 
 async def calculate_entry(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    username = update.effective_user.username or ""
-    if username != TELEGRAM_USER:
-        await update.effective_message.reply_text("No estás autorizado para usar este bot.")
-        return ConversationHandler.END
     context.user_data["trade"] = None
     await update.effective_message.reply_text("Por favor ingresá el trade para calcular.")
     return CALCULATE
@@ -353,13 +405,11 @@ async def place_trade_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
             await update.effective_message.reply_text("Trade parseado. Conectando a MetaTrader...")
         except Exception as e:
             logger.exception("Parse error: %s", e)
-            await update.effective_message.reply_text(
-                "Error al parsear el trade. Revisá el formato.\nEjemplo:\nBUY GBPUSD\nEntry NOW\nSL 1.14336\nTP 1.28930"
-            )
+            await update.effective_message.reply_text(_PARSE_ERROR)
             return TRADE
 
     # Ejecutar conexión y trade (enter_trade=True)
-    await connect_and_process(update, context.user_data["trade"], enter_trade=True)
+    await connect_and_process(update, context, context.user_data["trade"], enter_trade=True)
     context.user_data["trade"] = None
     return ConversationHandler.END
 
@@ -375,13 +425,11 @@ async def calculate_trade_handler(update: Update, context: ContextTypes.DEFAULT_
             await update.effective_message.reply_text("Trade parseado. Conectando a MetaTrader para calcular...")
         except Exception as e:
             logger.exception("Parse error: %s", e)
-            await update.effective_message.reply_text(
-                "Error al parsear el trade. Revisá el formato.\nEjemplo:\nBUY GBPUSD\nEntry NOW\nSL 1.14336\nTP 1.28930"
-            )
+            await update.effective_message.reply_text(_PARSE_ERROR)
             return CALCULATE
 
     # Calcular (enter_trade=False)
-    await connect_and_process(update, context.user_data["trade"], enter_trade=False)
+    await connect_and_process(update, context, context.user_data["trade"], enter_trade=False)
     await update.effective_message.reply_text("¿Deseás entrar este trade? /yes o /no")
     return DECISION
 
@@ -392,7 +440,7 @@ async def yes_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
         await update.effective_message.reply_text("No hay trade pendiente. Reintentá con /trade o /calculate.")
         return ConversationHandler.END
 
-    await connect_and_process(update, context.user_data["trade"], enter_trade=True)
+    await connect_and_process(update, context, context.user_data["trade"], enter_trade=True)
     context.user_data["trade"] = None
     return ConversationHandler.END
 
@@ -409,30 +457,64 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
 # ---------- App / main ----------
 
 
+async def post_init(app):
+    """Crea el cliente MetaApi compartido y el estado de la conexión ya dentro del event loop del bot."""
+    app.bot_data["metaapi"] = MetaApi(
+        API_KEY, {"requestTimeout": 60, "domain": METAAPI_DOMAIN})
+    app.bot_data["mt_lock"] = asyncio.Lock()
+    app.bot_data["mt_connection"] = None
+
+
+async def post_shutdown(app):
+    """Cierra la conexión RPC cacheada y el cliente MetaApi al apagar el bot."""
+    connection = app.bot_data.pop("mt_connection", None)
+    if connection is not None:
+        await _close_quietly(connection)
+    api = app.bot_data.pop("metaapi", None)
+    if api is not None:
+        try:
+            api.close()
+        except Exception as e:
+            logger.warning("Error al cerrar MetaApi: %s", e)
+
+
 def main():
-    app = ApplicationBuilder().token(TOKEN).build()
+    # uvloop (libuv) como event loop si está disponible; si no, asyncio estándar
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        logger.info("uvloop no disponible, usando el event loop por defecto de asyncio")
+
+    # post_init / post_shutdown crean y cierran el cliente MetaApi compartido por todos los updates
+    app = ApplicationBuilder().token(TOKEN).post_init(
+        post_init).post_shutdown(post_shutdown).build()
+
+    # Usuarios no autorizados: se responden acá y no llegan a ningún otro handler
+    app.add_handler(MessageHandler(~AUTH, deny_handler))
 
     # Comandos simples
-    app.add_handler(CommandHandler("start", start_command))
-    app.add_handler(CommandHandler("help", help_command))
+    app.add_handler(CommandHandler("start", start_command, filters=AUTH))
+    app.add_handler(CommandHandler("help", help_command, filters=AUTH))
 
     # Conversation handler (trade / calculate)
     conv = ConversationHandler(
-        entry_points=[CommandHandler("trade", trade_entry), CommandHandler(
-            "calculate", calculate_entry)],
+        entry_points=[CommandHandler("trade", trade_entry, filters=AUTH), CommandHandler(
+            "calculate", calculate_entry, filters=AUTH)],
         states={
-            TRADE: [MessageHandler(filters.TEXT & ~filters.COMMAND, place_trade_handler)],
-            CALCULATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, calculate_trade_handler)],
-            DECISION: [CommandHandler("yes", yes_handler), CommandHandler("no", cancel_handler)],
+            TRADE: [MessageHandler(AUTH & filters.TEXT & ~filters.COMMAND, place_trade_handler)],
+            CALCULATE: [MessageHandler(AUTH & filters.TEXT & ~filters.COMMAND, calculate_trade_handler)],
+            DECISION: [CommandHandler("yes", yes_handler, filters=AUTH),
+                       CommandHandler("no", cancel_handler, filters=AUTH)],
         },
-        fallbacks=[CommandHandler("cancel", cancel_handler)],
+        fallbacks=[CommandHandler("cancel", cancel_handler, filters=AUTH)],
         per_user=True,
     )
     app.add_handler(conv)
 
     # Mensajes no reconocidos
     app.add_handler(MessageHandler(
-        filters.TEXT & ~filters.COMMAND, unknown_command))
+        AUTH & filters.TEXT & ~filters.COMMAND, unknown_command))
 
     # Error handler
     app.add_error_handler(error_handler)
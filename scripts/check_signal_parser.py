@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# coding: utf-8
+"""
+Chequeo de regresión de parse_signal (run.py).
+
+Compara el parser basado en _SIGNAL_RE contra un parser de referencia por tokens
+(la implementación anterior, con splitlines()/split()) y verifica que entradas con
+mucho whitespace se rechacen en tiempo lineal (sin backtracking catastrófico).
+
+No importa run.py (necesitaría telegram/metaapi y las variables de entorno): toma del
+módulo solo las constantes del parser y parse_signal.
+
+Uso: python scripts/check_signal_parser.py   (exit code 1 si algo falla)
+"""
+
+import ast
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+RUN_PY = Path(__file__).resolve().parent.parent / "run.py"
+RISK_FACTOR = 0.01
+
+# Nombres de run.py que necesita parse_signal
+_PARSER_NAMES = {"SYMBOLS", "_ORDER_TYPES", "_NUM", "_SP", "_EOL", "_NL", "_FIELD", "_TYPES", "_SYMBOLS",
+                 "_SIGNAL_RE", "parse_signal"}
+
+# Tiempo máximo para rechazar cada entrada patológica; en tiempo lineal son pocos ms.
+# Primero un tamaño chico: un patrón cúbico ya tarda segundos ahí y con 10000 no terminaría.
+_MAX_SECONDS = 0.25
+_PATHOLOGICAL_SIZES = (300, 10000)
+_RANDOM_CASES = 50000
+
+
+def load_parse_signal():
+    tree = ast.parse(RUN_PY.read_text(encoding="utf-8"))
+    nodes = []
+    for node in tree.body:
+        if isinstance(node, ast.Assign):
+            names = {t.id for t in node.targets if isinstance(t, ast.Name)}
+        elif isinstance(node, ast.FunctionDef):
+            names = {node.name}
+        else:
+            continue
+        if names & _PARSER_NAMES:
+            nodes.append(node)
+    ns = {"re": re, "Dict": Dict, "List": List, "RISK_FACTOR": RISK_FACTOR}
+    exec(compile(ast.Module(body=nodes, type_ignores=[]), str(RUN_PY), "exec"), ns)
+    return ns["parse_signal"], ns["SYMBOLS"]
+
+
+def reference_parse(signal_text: str, symbols) -> Dict:
+    """Parser por tokens: cada campo es la última palabra de su línea no vacía."""
+    lines = [toks for toks in map(str.split, signal_text.splitlines()) if toks]
+    if len(lines) < 4:
+        return {}
+
+    first = lines[0]
+    key = tuple(t.lower() for t in first[:2])
+    order_type = {("buy", "limit"): "Buy Limit", ("sell", "limit"): "Sell Limit",
+                  ("buy", "stop"): "Buy Stop", ("sell", "stop"): "Sell Stop"}.get(key) \
+        or {"buy": "Buy", "sell": "Sell"}.get(key[0])
+    symbol = first[-1].upper()
+    if order_type is None or len(first) < 2 or symbol not in symbols:
+        return {}
+
+    def to_float(tok: str) -> Optional[float]:
+        return float(tok) if re.match(r"[-+]?\d+(?:\.\d+)?$", tok) else None
+
+    entry_raw = lines[1][-1].upper()
+    entry = entry_raw if entry_raw == "NOW" else to_float(entry_raw)
+    stoploss = to_float(lines[2][-1])
+    tp_list = [to_float(ln[-1]) for ln in lines[3:5]]
+    if entry is None or stoploss is None or None in tp_list:
+        return {}
+
+    return {"OrderType": order_type, "Symbol": symbol, "Entry": entry, "StopLoss": stoploss,
+            "TP": tp_list, "RiskFactor": RISK_FACTOR}
+
+
+# Casos puntuales (incluye los reportados en review)
+_FIXED_CASES = [
+    "BUY GBPUSD\nEntry NOW\nSL 1.14336\nTP 1.28930\nTP 1.29845",
+    "buy limit usdjpy\n\nEntry 140.1\nSL 141\nTP 139",
+    "BUY GBPUSD\nEntry 1.5\nSL 1.1 TP 1.2\nTP 1.3",
+    "BUY GBPUSD\nEntry NOW\nSL 1.1\nTP 1.28930\x0bTP 1.3",
+    "BUY\xa0EURUSD\nEntry NOW\nSL 1.1\nTP 1.2",
+    "BUY LIMIT\xa0GBPUSD\nEntry 1.5\nSL 1.1\nTP 1.2",
+    "BUY STOPX GBPUSD\nEntry NOW\nSL 1\nTP 2",
+    "BUY NOW\nEntry NOW\nSL 1\nTP 2",
+    "BUY GBPUSD\nEntry NOW\nSL 1\nTP 2\nTP zz",
+    "BUY GBPUSD\nEntry NOW\nSL 1\nTP 2\nTP 3\nTP 4",
+    "BUY GBPUSD\nEntry 1.2e3\nSL 1\nTP 2",
+    "BUY GBPUSD\nEntry NOW\nSL 1",
+    "hello",
+    "",
+]
+
+_LINE_SEPS = ["\n", "\r\n", "\r", "\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029",
+              "\n\n", "\n \n"]
+_SPACES = [" ", "\t", "\xa0", "\u3000", "\x1f", "  ", " \xa0"]
+_FIRSTS = ["BUY{s}GBPUSD", "buy{s}limit{s}usdjpy", "Sell{s}Stop{s}XAUUSD", "BUY{s}NOW{s}GBPUSD", "BUY{s}NOW",
+           "BUYX{s}GBPUSD", "BUY{s}STOPX{s}GBPUSD", "SELL{s}FOOBAR", "{s}BUY{s}GBPUSD{s}", "BUY{s}GBPUSDm",
+           "SELL{s}a{s}b{s}EURUSD", "hello"]
+_ENTRIES = ["Entry{s}NOW", "Entry{s}now", "Entry{s}1.2345", "1.2", "Entry{s}1.2e3", "Entry{s}x", "Entry{s}.5",
+            "Entry{s}1.2{s}"]
+_NUMS = ["SL{s}1.14", "SL{s}x", "1", "TP{s}1.2.3", "TP{s}+3", "TP{s}1.{s}", "TP{s}2{s}"]
+_TAILS = [None, "TP{s}2.5", "TP{s}zz", "TP{s}2.5{n}extra", "{s}"]
+
+
+def _random_cases(n: int):
+    rng = random.Random(0)
+    for _ in range(n):
+        parts = [rng.choice(_FIRSTS), rng.choice(_ENTRIES), rng.choice(_NUMS), rng.choice(_NUMS)]
+        tail = rng.choice(_TAILS)
+        if tail:
+            parts.append(tail)
+        text = rng.choice(["", " ", "\n", rng.choice(_SPACES)])
+        for i, part in enumerate(parts):
+            if i:
+                text += rng.choice(_LINE_SEPS)
+            text += part.replace("{n}", rng.choice(_LINE_SEPS)).format(s=rng.choice(_SPACES))
+        yield text + rng.choice(["", "\n", rng.choice(_SPACES)])
+
+
+def _pathological_cases(n: int):
+    return {
+        "header con espacios": "BUY" + " " * n + "GBPUSDm\n1\n1\n1",
+        "header con palabras": "BUY " + "a " * n + "GBPUSDm\n1\n1\n1",
+        "espacios al inicio de Entry": "BUY GBPUSD\n" + " " * n + "x\n1\n1",
+        "espacios al final de Entry": "BUY GBPUSD\n1" + " " * n + "x\n1\n1",
+        "espacios al final de TP1": "BUY GBPUSD\n1\n1\n1" + " " * n + "x",
+        "líneas en blanco": "BUY GBPUSD\n" + " \n" * n + "x\n1\n1",
+        "números en TP2": "BUY GBPUSD\n1\n1\n1\n" + "1 " * n + "x",
+    }
+
+
+def main() -> int:
+    parse_signal, symbols = load_parse_signal()
+    failures = 0
+
+    cases = _FIXED_CASES + list(_random_cases(_RANDOM_CASES))
+    for text in cases:
+        got, expected = parse_signal(text), reference_parse(text, symbols)
+        if got != expected:
+            failures += 1
+            if failures <= 10:
+                print(f"DIFERENCIA {text!r}\n  parse_signal: {got}\n  referencia:   {expected}")
+    print(f"equivalencia: {len(cases)} casos, {failures} diferencias")
+
+    for n in _PATHOLOGICAL_SIZES:
+        slow = 0
+        for name, text in _pathological_cases(n).items():
+            start = time.perf_counter()
+            parse_signal(text)
+            elapsed = time.perf_counter() - start
+            ok = elapsed <= _MAX_SECONDS
+            slow += not ok
+            print(f"{'ok  ' if ok else 'LENTO'} {name} (n={n}): {elapsed * 1000:.1f} ms")
+        if slow:
+            failures += slow
+            break
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())